@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.database import User
@@ -21,10 +22,13 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     
     # Create new user
     hashed_password = get_password_hash(user_data.password)
-    new_user = User(username=user_data.username, hashed_password=hashed_password)
-    db.add(new_user)
+    new_user = db.scalar(
+        insert(User)
+        .values(username=user_data.username, hashed_password=hashed_password)
+        .returning(User)
+    )
+    db.expunge(new_user)
     db.commit()
-    db.refresh(new_user)
     
     return new_user
 
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
-from app.models.database import User, ChatThread, ChatMessage, MessageRole
+from sqlalchemy import exists, lambda_stmt, select, update
+from sqlalchemy.orm import Session, joinedload, raiseload
+from typing import List, Optional
+from app.core.config import settings
+from app.db.session import get_db, run_in_db_executor
+from app.models.database import User, ChatThread, ChatMessage, MessageRole, utcnow
 from app.models.services import ChatService
 from app.schemas.chat import (
     ChatThreadCreate, ChatThreadResponse, ChatMessageCreate,
@@ -11,11 +13,25 @@ from app.schemas.chat import (
 )
 from app.api.dependencies import get_current_user
 from app.services.agent import deep_agent_service
-from datetime import datetime
+from app.services.streaming import buffered
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+# How many SSE events the agent may run ahead of the client connection
+SSE_BUFFER_EVENTS = 8
+
+
+def _owned_thread_with_messages(db: Session, thread_id: int, user_id: int) -> Optional[ChatThread]:
+    """Load a user's thread with its messages eagerly joined, or None."""
+    # The history reads run on every page load; lambda_stmt builds the
+    # statement once and only rebinds thread_id/user_id
+    return db.scalars(lambda_stmt(
+        lambda: select(ChatThread)
+        .options(joinedload(ChatThread.messages))
+        .where(ChatThread.id == thread_id, ChatThread.user_id == user_id)
+    )).unique().first()
+
 
 @router.post("/threads", response_model=ChatThreadResponse, status_code=status.HTTP_201_CREATED)
 def create_thread(
@@ -34,11 +50,15 @@ def get_threads(
     db: Session = Depends(get_db)
 ):
     """Get all chat threads for current user."""
-    threads = db.query(ChatThread).filter(
-        ChatThread.user_id == current_user.id
-    ).order_by(ChatThread.updated_at.desc()).all()
-    
-    return threads
+    user_id = current_user.id
+    # ChatThreadResponse has no relationships; forbid lazy loads per row.
+    # lambda_stmt builds the statement once and only rebinds user_id
+    return db.scalars(lambda_stmt(
+        lambda: select(ChatThread)
+        .options(raiseload("*"))
+        .where(ChatThread.user_id == user_id)
+        .order_by(ChatThread.updated_at.desc())
+    )).all()
 
 
 @router.get("/threads/{thread_id}", response_model=ChatHistoryResponse)
@@ -48,10 +68,8 @@ def get_thread_history(
     db: Session = Depends(get_db)
 ):
     """Get chat history for a specific thread."""
-    thread = db.query(ChatThread).filter(
-        ChatThread.id == thread_id,
-        ChatThread.user_id == current_user.id
-    ).first()
+    # Ownership check and history in one round trip
+    thread = _owned_thread_with_messages(db, thread_id, current_user.id)
     
     if not thread:
         raise HTTPException(
@@ -59,13 +77,9 @@ def get_thread_history(
             detail="Chat thread not found"
         )
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.thread_id == thread_id
-    ).order_by(ChatMessage.created_at).all()
-    
     return {
         "thread": thread,
-        "messages": messages
+        "messages": thread.messages
     }
 
 
@@ -76,23 +90,50 @@ def delete_thread(
     db: Session = Depends(get_db)
 ):
     """Delete a chat thread."""
-    thread = db.query(ChatThread).filter(
-        ChatThread.id == thread_id,
-        ChatThread.user_id == current_user.id
-    ).first()
-    
-    if not thread:
+    if not ChatService.delete_chat(db, thread_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat thread not found"
         )
     
-    db.delete(thread)
-    db.commit()
+    deep_agent_service.clear_thread_state(thread_id)
     
     return None
 
 
+def _save_user_message(db: Session, thread_id: int, user_id: int, content: str) -> Optional[bool]:
+    """
+    Bump the thread and store the user's message.
+    Returns None if the thread is not owned, else whether it is the first message.
+    """
+    # The ownership check is the UPDATE's WHERE clause, so there is no
+    # SELECT to load the thread first
+    bumped = db.execute(
+        update(ChatThread)
+        .where(ChatThread.id == thread_id, ChatThread.user_id == user_id)
+        .values(updated_at=utcnow())
+    ).rowcount
+    if not bumped:
+        return None
+    
+    # Only the semantic cache cares, so only pay for the check when it is on
+    first_turn = settings.SEMANTIC_CACHE_ENABLED and not db.scalar(
+        select(exists().where(ChatMessage.thread_id == thread_id))
+    )
+    
+    # Save the user message in the same transaction as the bump
+    db.add(ChatMessage(
+        thread_id=thread_id,
+        role=MessageRole.HUMAN,
+        content=content
+    ))
+    db.commit()
+    # Hand the connection back before streaming: the response can take
+    # minutes and the stream persists through its own short sessions
+    db.close()
+    return first_turn
+
+
 @router.post("/threads/{thread_id}/messages")
 async def send_message(
     thread_id: int,
@@ -104,37 +145,24 @@ async def send_message(
     Send a message and stream AI response.
     Returns Server-Sent Events (SSE) stream.
     """
-    # Verify thread ownership
-    thread = db.query(ChatThread).filter(
-        ChatThread.id == thread_id,
-        ChatThread.user_id == current_user.id
-    ).first()
-    
-    if not thread:
+    # The handler is async, so the blocking DB round trips run on the DB
+    # executor instead of the event loop
+    first_turn = await run_in_db_executor(
+        _save_user_message, db, thread_id, current_user.id, message_data.content
+    )
+    if first_turn is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat thread not found"
         )
     
-    thread.updated_at = datetime.utcnow()
-    db.commit()
-    
-    # Save user message
-    user_message = ChatMessage(
-        thread_id=thread_id,
-        role=MessageRole.HUMAN,
-        content=message_data.content
-    )
-    db.add(user_message)
-    db.commit()
-    
     # Stream AI response
     async def generate():
-        async for event in deep_agent_service.stream_chat_response(
+        async for event in buffered(deep_agent_service.stream_chat_response(
             message_content=message_data.content,
-            thread=thread,
-            db=db
-        ):
+            thread_id=thread_id,
+            first_turn=first_turn
+        ), maxsize=SSE_BUFFER_EVENTS):
             yield event
     
     return StreamingResponse(
@@ -155,11 +183,8 @@ def get_messages(
     db: Session = Depends(get_db)
 ):
     """Get all messages in a thread."""
-    # Verify thread ownership
-    thread = db.query(ChatThread).filter(
-        ChatThread.id == thread_id,
-        ChatThread.user_id == current_user.id
-    ).first()
+    # Verify thread ownership and load its messages in one round trip
+    thread = _owned_thread_with_messages(db, thread_id, current_user.id)
     
     if not thread:
         raise HTTPException(
@@ -167,8 +192,4 @@ def get_messages(
             detail="Chat thread not found"
         )
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.thread_id == thread_id
-    ).order_by(ChatMessage.created_at).all()
-    
-    return messages
+    return thread.messages
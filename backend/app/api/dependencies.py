@@ -1,12 +1,43 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.database import User
 from app.core.auth import decode_access_token
+from app.core.config import settings
 
 security = HTTPBearer()
 
+# user_id -> (expires_at, detached User). Every authenticated request
+# resolves its user, and nothing in the app changes a user once created;
+# USER_CACHE_TTL bounds how stale an entry can get.
+_user_cache: OrderedDict = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def _cached_user(user_id: int) -> Optional[User]:
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _user_cache[user_id]
+            return None
+        _user_cache.move_to_end(user_id)
+        return entry[1]
+
+
+def _cache_user(user: User) -> None:
+    with _user_cache_lock:
+        _user_cache[user.id] = (time.monotonic() + settings.USER_CACHE_TTL, user)
+        _user_cache.move_to_end(user.id)
+        while len(_user_cache) > settings.USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -30,11 +61,21 @@ def get_current_user(
             detail="Invalid authentication credentials"
         )
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user_id = int(user_id)
+    user = _cached_user(user_id)
+    if user is not None:
+        return user
+    
+    user = db.get(User, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
+    # Detach it so a later commit in the request cannot expire the
+    # attributes other requests will read from the cache
+    db.expunge(user)
+    _cache_user(user)
     return user
+
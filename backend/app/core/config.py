@@ -10,24 +10,56 @@ class Settings(BaseSettings):
     APP_NAME: str = "LegalGPT API"
     VERSION: str = "0.1.0"
     DEBUG: bool = True
+    THREAD_POOL_SIZE: int = 64  # default asyncio executor (sync tool calls)
     
     # Database
     DATABASE_URL: str = "sqlite://"
+    DB_AUTO_CREATE: bool = True  # create_all + demo user at startup; disable when migrations own the schema
+    DB_EXECUTOR_WORKERS: int = 32
+    DB_POOL_SIZE: int = 25
+    DB_MAX_OVERFLOW: int = 50
+    DB_POOL_USE_LIFO: bool = True
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a pooled connection
+    PERSIST_BATCH_SIZE: int = 32  # messages per background commit
     
     # ChromaDB
     CHROMA_PERSIST_DIR: str = "./chroma_db"
     CHROMA_COLLECTION_NAME: str = "legal_documents"
+    CHROMA_EF_SEARCH: int | None = None  # HNSW query breadth; None keeps each store's own (Chroma default 100)
     
     # Auth
     SECRET_KEY: str = "your-secret-key-change-in-production"
 # keep secret secure
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    USER_CACHE_TTL: int = 60  # seconds
+    USER_CACHE_SIZE: int = 10_000
     
     # Ollama
     ollama_base_url: str = "https://api.ollama.com"
     ollama_model: str = "gpt-oss:120b"
     ollama_request_timeout: int = 300
+    ollama_keep_alive: int | str = -1  # keep the model (and its prompt KV cache) loaded
+    ollama_num_ctx: int | None = None
+    AGENT_MAX_INPUT_TOKENS: int | None = None  # history is summarized near this budget; defaults to ollama_num_ctx
+    LLM_MAX_CONCURRENCY: int = 0  # agent runs allowed in flight at once; 0 means unlimited
+    LLM_SLOT_TIMEOUT: float = 30  # seconds a request waits for a free run before erroring
+    LLM_CACHE_PATH: str = ""  # e.g. ".legalgpt_llm.db"; empty disables the exact-prompt cache
+    AGENT_STATE_MAX_THREADS: int = 1000  # threads whose agent state stays in this process's memory
+    
+    # Web search
+    SEARCH_CACHE_TTL: int = 900  # seconds
+    SEARCH_CACHE_SIZE: int = 1024
+    
+    # Streaming
+    SSE_COALESCE_INTERVAL: float = 0.025  # seconds of tokens per content frame
+    SSE_COALESCE_MAX_CHARS: int = 256  # flush early once this much text is buffered
+    
+    # Semantic cache (first-turn answers replayed for near-duplicate questions)
+    SEMANTIC_CACHE_ENABLED: bool = False  # answers are shared across all users, for a thread's first question only
+    SEMANTIC_CACHE_MAX_DISTANCE: float = 0.08  # cosine distance
     
     GEMINI_API_KEY:str = "your-gemini-api-key"
     GROQ_API_KEY:str = "your-groq-api-key"
@@ -1,9 +1,24 @@
-from sqlalchemy import create_engine
+import asyncio
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 from app.core.config import settings
 
+
+def _json_serializer(value) -> str:
+    # Same inputs the stdlib encoder took: non-str dict keys are
+    # stringified, anything else unserializable falls back to str()
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# JSON columns (tool_data, context metadata) encode/decode through orjson
+# instead of the stdlib json module
+_json_options = {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+
 # Create database engine
 if settings.DATABASE_URL.startswith("sqlite"):
     from sqlalchemy.pool import StaticPool
@@ -11,20 +26,37 @@ if settings.DATABASE_URL.startswith("sqlite"):
         settings.DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
+        **_json_options,
         echo=False
     )
 else:
+    # Recycling replaces pre-ping: a ping costs an extra round trip on
+    # every checkout, while recycling retires connections before the
+    # server or a proxy drops them. LIFO keeps reusing the warmest
+    # connections and lets surplus idle ones age out. A bounded checkout
+    # wait turns pool exhaustion into an error instead of a silent stall.
     engine = create_engine(
         settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_use_lifo=settings.DB_POOL_USE_LIFO,
+        **_json_options,
         echo=False  # Set to True for SQL logging during development
     )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Dedicated pool for blocking DB work issued from async code, so writes made
+# while streaming never queue behind the event loop's default executor.
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_EXECUTOR_WORKERS,
+    thread_name_prefix="db"
+)
+
 
 @contextmanager
 def get_db_context():
@@ -35,6 +67,12 @@ def get_db_context():
     finally:
         db.close()
 
+async def run_in_db_executor(func, *args, **kwargs):
+    """Run a blocking database callable on the dedicated DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args, **kwargs))
+
+
 def get_db():
     """Dependency to get database session."""
     db = SessionLocal()
@@ -48,3 +86,9 @@ def init_db():
     """Initialize database tables."""
     from app.models.database import User, ChatThread, ChatMessage, ContextMemory
     Base.metadata.create_all(bind=engine)
+
+
+def warm_up_pool():
+    """Open a pooled connection up front so the first request skips the handshake."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
@@ -1,9 +1,32 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.orm import relationship
-from datetime import datetime
 import enum
 from app.db.session import Base
 
+# Binary JSON on PostgreSQL (no re-parse on read); plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class utcnow(FunctionElement):
+    """Current UTC time as a naive timestamp, evaluated by the database."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # now() follows the session TimeZone; pin it to UTC like datetime.utcnow
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
 
 class User(Base):
     __tablename__ = "users"
@@ -11,7 +34,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow())
     
     # Relationships
     chat_threads = relationship("ChatThread", back_populates="user", cascade="all, delete-orphan")
@@ -20,16 +43,20 @@ class User(Base):
 
 class ChatThread(Base):
     __tablename__ = "chat_threads"
+    __table_args__ = (
+        # Serves the thread list (WHERE user_id ORDER BY updated_at DESC)
+        Index("ix_chat_threads_user_updated", "user_id", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True,autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(255), default="New Chat")
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow())
+    updated_at = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
     
     # Relationships
     user = relationship("User", back_populates="chat_threads")
-    messages = relationship("ChatMessage", back_populates="thread", cascade="all, delete-orphan", order_by="ChatMessage.created_at")
+    messages = relationship("ChatMessage", back_populates="thread", cascade="all, delete-orphan", order_by="[ChatMessage.created_at, ChatMessage.id]")
     context_memories = relationship("ContextMemory", back_populates="thread", cascade="all, delete-orphan")
 
 
@@ -41,6 +68,10 @@ class MessageRole(enum.Enum):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Serves the per-thread history scan (WHERE thread_id ORDER BY created_at)
+        Index("ix_chat_messages_thread_created", "thread_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     thread_id = Column(Integer, ForeignKey("chat_threads.id"), nullable=False)
@@ -49,9 +80,9 @@ class ChatMessage(Base):
 
     # For tool calls
     tool_name = Column(String(100), nullable=True)
-    tool_data = Column(JSON, nullable=True)
+    tool_data = Column(JSONType, nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow())
 
     # Relationships
     thread = relationship("ChatThread", back_populates="messages")
@@ -63,9 +94,9 @@ class ContextMemory(Base):
     id = Column(Integer, primary_key=True, index=True)
     key = Column(String(255), unique=True, index=True, nullable=False)
     value = Column(Text, nullable=True)
-    meta_data = Column("metadata", JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    meta_data = Column("metadata", JSONType, nullable=True)
+    created_at = Column(DateTime, server_default=utcnow())
+    updated_at = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
 
     # For tracking which thread/user this memory belongs to (optional)
     thread_id = Column(Integer, ForeignKey("chat_threads.id"), nullable=True, index=True)
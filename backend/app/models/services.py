@@ -1,11 +1,13 @@
 """Service layer for chat operations."""
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session, raiseload
 from typing import Optional, List, Tuple
 
 from app.models.database import (
     ChatThread,
     ChatMessage,
+    ContextMemory,
     User,
     MessageRole,
 )
@@ -21,13 +23,15 @@ class ChatService:
         title: Optional[str] = None,
     ) -> ChatThread:
         """Create a new chat thread for a user."""
-        chat = ChatThread(
-            user_id=user.id,
-            title=title or "New Chat",
+        # INSERT ... RETURNING fills id and the server-side timestamps in
+        # one round trip; expunging keeps commit from expiring them again
+        chat = db.scalar(
+            insert(ChatThread)
+            .values(user_id=user.id, title=title or "New Chat")
+            .returning(ChatThread)
         )
-        db.add(chat)
+        db.expunge(chat)
         db.commit()
-        db.refresh(chat)
         return chat
     @staticmethod
     def get_chat_by_id(
@@ -36,13 +40,13 @@ class ChatService:
         user_id: int,
     ) -> Optional[ChatThread]:
         """Get a chat thread by ID (scoped to user)."""
-        return (
-            db.query(ChatThread)
-            .filter(
+        return db.scalar(
+            select(ChatThread)
+            .where(
                 ChatThread.id == chat_id,
                 ChatThread.user_id == user_id,
             )
-            .first()
+            .limit(1)
         )
 
     @staticmethod
@@ -55,6 +59,9 @@ class ChatService:
         """List chat threads for a user."""
         return (
             db.query(ChatThread)
+            # List rows only carry thread columns; fail loudly on any
+            # per-row relationship load instead of issuing N+1 queries
+            .options(raiseload("*"))
             .filter(ChatThread.user_id == user_id)
             .order_by(ChatThread.updated_at.desc())
             .offset(skip)
@@ -69,11 +76,30 @@ class ChatService:
         user_id: int,
     ) -> bool:
         """Delete a chat thread and all related data."""
-        chat = ChatService.get_chat_by_id(db, chat_id, user_id)
-        if not chat:
+        # Bulk deletes scoped by ownership: nothing is loaded into the
+        # session, and the thread DELETE's rowcount is the existence check
+        owned = (
+            select(ChatThread.id)
+            .where(ChatThread.id == chat_id, ChatThread.user_id == user_id)
+        )
+        no_sync = {"synchronize_session": False}
+        db.execute(
+            delete(ChatMessage).where(ChatMessage.thread_id.in_(owned)),
+            execution_options=no_sync,
+        )
+        db.execute(
+            delete(ContextMemory).where(ContextMemory.thread_id.in_(owned)),
+            execution_options=no_sync,
+        )
+        deleted = db.execute(
+            delete(ChatThread)
+            .where(ChatThread.id == chat_id, ChatThread.user_id == user_id),
+            execution_options=no_sync,
+        ).rowcount
+        if not deleted:
+            db.rollback()
             return False
 
-        db.delete(chat)
         db.commit()
         return True
 
@@ -91,18 +117,34 @@ class MessageService:
         tool_data: Optional[dict] = None,
     ) -> ChatMessage:
         """Create a new message in a chat thread."""
-        message = ChatMessage(
-            thread_id=thread_id,
-            role=role,
-            content=content,
-            tool_name=tool_name,
-            tool_data=tool_data,
+        # RETURNING hands back id and created_at with the INSERT itself,
+        # so no refresh SELECT follows the commit
+        message = db.scalar(
+            insert(ChatMessage)
+            .values(
+                thread_id=thread_id,
+                role=role,
+                content=content,
+                tool_name=tool_name,
+                tool_data=tool_data,
+            )
+            .returning(ChatMessage)
         )
-        db.add(message)
+        db.expunge(message)
         db.commit()
-        db.refresh(message)
         return message
 
+    @staticmethod
+    def create_messages(
+        db: Session,
+        messages: List[dict],
+    ) -> None:
+        """Insert several messages in a single commit."""
+        # Core executemany: the rows are never read back, so skip the ORM
+        # unit of work and identity map
+        db.execute(insert(ChatMessage), messages)
+        db.commit()
+
     @staticmethod
     def get_messages_by_thread_id(
         db: Session,
@@ -112,7 +154,7 @@ class MessageService:
         return (
             db.query(ChatMessage)
             .filter(ChatMessage.thread_id == thread_id)
-            .order_by(ChatMessage.created_at)
+            .order_by(ChatMessage.created_at, ChatMessage.id)
             .all()
         )
 
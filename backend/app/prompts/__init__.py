@@ -1,9 +1,12 @@
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=1)
 def get_system_prompt() -> str:
     prompt_path = Path(__file__).parent / "SYSTEM_PROMPT.md"
     return prompt_path.read_text(encoding="utf-8")
 
+@lru_cache(maxsize=1)
 def get_skills_prompt() -> str:
     prompt_path = Path(__file__).parent / "SKILLS.md"
     return prompt_path.read_text(encoding="utf-8")
\ No newline at end of file
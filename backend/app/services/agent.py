@@ -1,32 +1,45 @@
-import json
 import logging
 import asyncio
-from typing import AsyncGenerator, Dict, List, Any, Optional
+import time
+import orjson
+from sqlalchemy.exc import SQLAlchemyError
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pydantic_core import to_json
+from typing import TYPE_CHECKING, AsyncGenerator, Dict, List, Any, Optional
 
-from deepagents import create_deep_agent
-from langchain_ollama import ChatOllama
 from langchain_core.messages import (
-    BaseMessage,
     HumanMessage,
     AIMessage,
     ToolMessage,
-    SystemMessage
 )
 from app.core.config import settings
-from sqlalchemy.orm import Session
-from langgraph.checkpoint.memory import InMemorySaver
-from app.models.database import ChatThread, MessageRole
+from app.db.session import get_db_context, run_in_db_executor
+from app.services.checkpointer import BoundedMemorySaver
+from app.models.database import MessageRole
 from app.tools import internet_search
 from app.prompts import get_system_prompt
 from app.schemas.chat import StreamChunk
-from app.models.services import ChatService, MessageService
+from app.services.semantic_cache import SemanticCache
+from app.services.streaming import IDLE, buffered
+from app.models.services import MessageService
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
-from deepagents import SubAgent
+SSE_DATA = b"data: "
+SSE_END = b"\n\n"
+CONTENT_FRAME_END = b"}" + SSE_END
+# Graph node whose LLM output is the reply streamed to the client
+AGENT_MODEL_NODE = "model"
 
-researcher_agent = SubAgent(
+if TYPE_CHECKING:
+    from deepagents import SubAgent
+
+# deepagents and langchain_ollama are imported on first use: they take
+# about a second to load and auth/health requests never need them.
+# SubAgent is a TypedDict, so a plain dict is the same value at runtime.
+researcher_agent: "SubAgent" = dict(
     name="researcher",
     description="A specialist researcher agent that searches the internet to gather facts, case laws, statutes, and general information on a given query.",
     system_prompt="You are an expert researcher agent. Search the internet using the tools available to you to find accurate, up-to-date information regarding the query. Synthesize your findings into a clear, detailed, and factual summary. Do not make up any facts or cases; rely only on what the tools return.",
@@ -37,7 +50,26 @@ tools = []
 SYSTEM_PROMPT = get_system_prompt()
 
 
+@lru_cache(maxsize=1)
+def _llm_cache():
+    """Exact-prompt response cache shared by every model, if configured."""
+    if not settings.LLM_CACHE_PATH:
+        return None
+    from langchain_community.cache import SQLiteCache
+
+    return SQLiteCache(database_path=settings.LLM_CACHE_PATH)
+
+
+def _model_profile() -> Optional[Dict[str, Any]]:
+    # With max_input_tokens known, deepagents' summarization middleware
+    # compacts older turns at 85% of the budget instead of at 170k tokens
+    max_input = settings.AGENT_MAX_INPUT_TOKENS or settings.ollama_num_ctx
+    return {"max_input_tokens": max_input} if max_input else None
+
+
+@lru_cache(maxsize=8)
 def llm_factory(**kwargs):
+    # Cached so every caller shares one client (and its Ollama connection pool)
     # return ChatOpenAI(
     #     api_key=settings.OLLAMA_API_KEY,
     #     model=settings.ollama_model,
@@ -45,98 +77,277 @@ def llm_factory(**kwargs):
     #     temperature=0.0,
     #     **kwargs
     # )
+    from langchain_ollama import ChatOllama
+
     return ChatOllama(
         # client_kwargs={'Authorization': 'Bearer ' + settings.OLLAMA_API_KEY},
         model=settings.ollama_model,
         base_url=settings.ollama_base_url,
         temperature=0.0,
+        keep_alive=settings.ollama_keep_alive,
+        num_ctx=settings.ollama_num_ctx,
+        profile=_model_profile(),
+        cache=_llm_cache(),
         **kwargs
     )
 
 
+_ts_cache = (0, "")
+
+
+def _now_iso() -> str:
+    """UTC ISO timestamp at second resolution, formatted once per second."""
+    global _ts_cache
+    sec = int(time.time())
+    if sec != _ts_cache[0]:
+        _ts_cache = (sec, datetime.fromtimestamp(sec, tz=timezone.utc).isoformat())
+    return _ts_cache[1]
+
+
+def _normalize_tool_output(output: Any) -> str:
+    """Render a tool result for the client without repr-ing whole objects."""
+    if hasattr(output, "content"):
+        output = output.content
+    if isinstance(output, str):
+        return output
+    if isinstance(output, (dict, list)):
+        return orjson.dumps(output, default=str).decode()
+    return str(output)
+
+
+class _ContentBuffer:
+    """Collects token deltas so that tokens arriving close together share one SSE frame."""
+
+    def __init__(self, interval: float, max_chars: int):
+        self.interval = interval
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def __bool__(self) -> bool:
+        return bool(self._parts)
+
+    def append(self, text: str) -> bool:
+        """Buffer a delta; returns True once the frame is due to be flushed."""
+        self._parts.append(text)
+        self._size += len(text)
+        return (
+            self._size >= self.max_chars
+            or time.monotonic() - self._last_flush >= self.interval
+        )
+
+    def flush(self) -> str:
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        self._last_flush = time.monotonic()
+        return text
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until buffered text is due, or None while empty."""
+        if not self._parts:
+            return None
+        return max(0.0, self.interval - (time.monotonic() - self._last_flush))
+
+
 class DeepAgentService:
 
     def __init__(self):
-        self.llm = llm_factory()
+        self._llm = None
+        self._agent = None
         self.tools = tools
+        # One saver for the whole process; LangGraph keys state by thread_id.
+        # Bounded because nothing else ever frees a thread's checkpoints
+        self.checkpointer = BoundedMemorySaver(settings.AGENT_STATE_MAX_THREADS)
+        # Message writes are queued and committed in batches off the stream
+        self._persist_queue: Optional[asyncio.Queue] = None
+        self._persist_task: Optional[asyncio.Task] = None
+        self.semantic_cache = SemanticCache(SYSTEM_PROMPT)
+        # Optional cap on concurrent model runs, for self-hosted Ollama
+        # servers that thrash their KV cache when juggling many prompts
+        self._llm_slots: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+            if settings.LLM_MAX_CONCURRENCY > 0
+            else None
+        )
+
+    @property
+    def llm(self):
+        # Built on first use so importing the app does not open an Ollama client
+        if self._llm is None:
+            self._llm = llm_factory()
+        return self._llm
+
+    @property
+    def agent(self):
+        # Compiled once per process; the shared checkpointer scopes state
+        # per thread_id through the run config
+        if self._agent is None:
+            self._agent = self._create_deep_agent(SYSTEM_PROMPT)
+        return self._agent
+
+    @asynccontextmanager
+    async def _run_slot(self):
+        """Hold one of the LLM_MAX_CONCURRENCY run slots, waiting a bounded time for it."""
+        if self._llm_slots is None:
+            yield
+            return
+        # The start frame is already out, so a client queued behind busy
+        # runs gets an error frame instead of a silent stream
+        try:
+            async with asyncio.timeout(settings.LLM_SLOT_TIMEOUT or None):
+                await self._llm_slots.acquire()
+        except TimeoutError:
+            raise RuntimeError("The assistant is busy, please try again shortly") from None
+        try:
+            yield
+        finally:
+            self._llm_slots.release()
 
     def _create_deep_agent(
         self,
         system_prompt: str,
-        thread_id: str,
         subagents: Optional[List[Dict]] = None
     ):
-        checkpointer = InMemorySaver()
-        try:
-            if subagents is None:
-                subagents = [researcher_agent]
-            return create_deep_agent(
-                model=self.llm,
-                tools=self.tools,
-                system_prompt=system_prompt,
-                checkpointer=checkpointer,
-                subagents=subagents
-            )
-        finally:
-            checkpointer.close()
+        if subagents is None:
+            subagents = [researcher_agent]
+        from deepagents import create_deep_agent
+
+        return create_deep_agent(
+            model=self.llm,
+            tools=self.tools,
+            system_prompt=system_prompt,
+            checkpointer=self.checkpointer,
+            subagents=subagents
+        )
 
     async def stream_chat_response(
         self,
         message_content: str,
-        thread: ChatThread,
-        db: Session
-    ) -> AsyncGenerator[str, None]:
+        thread_id: int,
+        first_turn: bool = False
+    ) -> AsyncGenerator[bytes, None]:
 
         # Send start event — outside try so a failure here is a true server error
         start_chunk = StreamChunk(
             type="start",
-            session_id=thread.id,
+            session_id=thread_id,
             content=message_content,
-            checkpointer_metadata={"timestamp": datetime.now(timezone.utc).isoformat()}
+            checkpointer_metadata={"timestamp": _now_iso()}
         )
-        yield f"data: {start_chunk.model_dump_json()}\n\n"
+        yield self._sse(start_chunk)
 
         full_response = ""
         tool_calls_made = []
+        pending = _ContentBuffer(
+            settings.SSE_COALESCE_INTERVAL, settings.SSE_COALESCE_MAX_CHARS
+        )
+        # Content frames differ only in their text, so the rest of the
+        # JSON object is encoded once per request
+        content_prefix = (
+            SSE_DATA
+            + b'{"type":"content","session_id":'
+            + orjson.dumps(thread_id)
+            + b',"content":'
+        )
+
+        def flush_content() -> bytes:
+            return content_prefix + orjson.dumps(pending.flush()) + CONTENT_FRAME_END
 
         try:
-            agent = self._create_deep_agent(SYSTEM_PROMPT, thread.id)
+            agent = self.agent
 
             config = {
                 "configurable": {
-                    "thread_id": thread.id,
+                    "thread_id": str(thread_id),
                     "checkpoint_ns": ""
                 }
             }
 
-            async with asyncio.timeout(settings.ollama_request_timeout or 300):
-                async for event in agent.astream_events(
-                    {"messages": [HumanMessage(content=message_content)]},
-                    config=config,
-                    version="v1"
-                ):
-                    event_type = event.get("event")
-
-                    if event_type == "on_chat_model_stream":
-                        chunk = event.get("data", {}).get("chunk", {})
-                        if chunk and hasattr(chunk, "content") and chunk.content:
-                            full_response += chunk.content
-                            yield f"data: {StreamChunk(type='content', content=chunk.content, session_id=thread.id).model_dump_json()}\n\n"
-
-                    elif event_type == "on_tool_start":
-                        tool_name = event.get("name", "unknown")
-                        tool_input = event.get("data", {}).get("input", {})
-                        tool_calls_made.append({"tool": tool_name, "input": tool_input})
-                        yield f"data: {StreamChunk(type='tool_call', tool_name=tool_name, tool_input=tool_input, session_id=thread.id, checkpointer_metadata={'timestamp': datetime.now(timezone.utc).isoformat()}).model_dump_json()}\n\n"
-
-                    elif event_type == "on_tool_end":
-                        tool_name = event.get("name", "unknown")
-                        tool_output = str(event.get("data", {}).get("output", ""))
-                        yield f"data: {StreamChunk(type='tool_result', tool_name=tool_name, tool_output=tool_output, session_id=thread.id, checkpointer_metadata={'timestamp': datetime.now(timezone.utc).isoformat()}).model_dump_json()}\n\n"
+            # Cached answers are only reused to open a conversation; later
+            # turns depend on context the cache does not capture. The caller
+            # decides from the stored messages, since agent state is
+            # per process and missing after a restart or eviction
+            use_cache = settings.SEMANTIC_CACHE_ENABLED and first_turn
+            cached = None
+            if use_cache:
+                cached = await asyncio.to_thread(
+                    self.semantic_cache.lookup, message_content
+                )
+
+            if cached is not None:
+                # Record the exchange so follow-up turns still see it
+                await agent.aupdate_state(
+                    config,
+                    {"messages": [
+                        HumanMessage(content=message_content),
+                        AIMessage(content=cached),
+                    ]},
+                )
+                full_response = cached
+                pending.append(cached)
+            else:
+                async with self._run_slot(), asyncio.timeout(settings.ollama_request_timeout or 300):
+                    async for item in buffered(agent.astream(
+                        {"messages": [HumanMessage(content=message_content)]},
+                        config=config,
+                        stream_mode=["messages", "updates"],
+                        # Subagents run as nested graphs; their tool calls
+                        # are reported alongside the main agent's
+                        subgraphs=True,
+                    ), idle_timeout=pending.remaining):
+                        if item is IDLE:
+                            yield flush_content()
+                            continue
+                        namespace, mode, payload = item
+                        if mode == "messages":
+                            # Token deltas, or the whole reply on an LLM
+                            # cache hit; tool messages arrive via updates.
+                            # Only the agent's own model node speaks to the
+                            # user: subagents and middleware such as
+                            # summarization run LLM calls streamed here too
+                            message, metadata = payload
+                            if (
+                                namespace
+                                or not isinstance(message, AIMessage)
+                                or metadata.get("langgraph_node") != AGENT_MODEL_NODE
+                            ):
+                                continue
+                            content = message.content
+                            if content and isinstance(content, str):
+                                full_response += content
+                                if pending.append(content):
+                                    yield flush_content()
+                            continue
+
+                        for update in payload.values():
+                            messages = update.get("messages") if isinstance(update, dict) else None
+                            if not isinstance(messages, list):
+                                continue
+                            for message in messages:
+                                if isinstance(message, AIMessage):
+                                    for call in message.tool_calls:
+                                        # Flush first so text and tool events stay in order
+                                        if pending:
+                                            yield flush_content()
+                                        tool_calls_made.append({"tool": call["name"], "input": call["args"]})
+                                        yield self._sse(StreamChunk(type='tool_call', tool_name=call["name"], tool_input=call["args"], session_id=thread_id, checkpointer_metadata={'timestamp': _now_iso()}))
+
+                                elif isinstance(message, ToolMessage):
+                                    if pending:
+                                        yield flush_content()
+                                    tool_output = _normalize_tool_output(message)
+                                    yield self._sse(StreamChunk(type='tool_result', tool_name=message.name or "unknown", tool_output=tool_output, session_id=thread_id, checkpointer_metadata={'timestamp': _now_iso()}))
+
+            if pending:
+                yield flush_content()
 
         except Exception as e:
-            logger.exception("Error during agent stream for thread %s", thread.id)
-            yield f"data: {StreamChunk(type='error', content=str(e), session_id=thread.id, checkpointer_metadata={'timestamp': datetime.now(timezone.utc).isoformat()}).model_dump_json()}\n\n"
+            logger.exception("Error during agent stream for thread %s", thread_id)
+            if pending:
+                yield flush_content()
+            yield self._sse(StreamChunk(type='error', content=str(e), session_id=thread_id, checkpointer_metadata={'timestamp': _now_iso()}))
             # Early return — don't send 'end' after an error so the client
             # knows the stream did not complete successfully
             return
@@ -145,30 +356,80 @@ class DeepAgentService:
         # Only reached on clean completion (no exception)
         # ----------------------------------------------------------------
 
-        # Save assistant message in a separate try so a DB failure doesn't
-        # retroactively make the stream look like it errored
-        try:
-            if full_response:
-                MessageService.create_message(
-                    db=db,
-                    thread_id=thread.id,
-                    role=MessageRole.AI,
-                    content=full_response,
-                )
-        except Exception as db_err:
-            # Log but don't surface to client — the stream itself succeeded
-            logger.error(
-                "Failed to persist AI message for thread %s: %s",
-                thread.id, db_err
+        # Persistence happens on the background worker; a DB failure there
+        # is logged and never makes the stream look like it errored
+        if full_response:
+            await self._enqueue_message(
+                thread_id=thread_id,
+                role=MessageRole.AI,
+                content=full_response,
             )
 
-        yield f"data: {StreamChunk(type='end', session_id=thread.id, checkpointer_metadata={'timestamp': datetime.now(timezone.utc).isoformat(), 'tools_used': len(tool_calls_made)}).model_dump_json()}\n\n"
+        yield self._sse(StreamChunk(type='end', session_id=thread_id, checkpointer_metadata={'timestamp': _now_iso(), 'tools_used': len(tool_calls_made)}))
 
-    def _format_sse(self, event_type: str, data: Dict) -> str:
-        try:
-            return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
-        except TypeError:
-            return f"event: error\ndata: {{\"message\": \"Serialization error\"}}\n\n"
+        # After 'end' so the client is not kept waiting on the embedding
+        if use_cache and cached is None and full_response:
+            await asyncio.to_thread(
+                self.semantic_cache.store, message_content, full_response
+            )
+
+    @staticmethod
+    def _sse(chunk: StreamChunk) -> bytes:
+        return SSE_DATA + to_json(chunk, fallback=str) + SSE_END
+
+    def clear_thread_state(self, thread_id: int) -> None:
+        """Drop the agent's stored conversation state for a thread."""
+        self.checkpointer.delete_thread(str(thread_id))
+
+    async def _enqueue_message(self, **fields: Any) -> None:
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_queue = asyncio.Queue()
+            self._persist_task = asyncio.create_task(self._persist_worker())
+        await self._persist_queue.put(fields)
+
+    async def _persist_worker(self) -> None:
+        """Drain queued messages and commit them in batches."""
+        queue = self._persist_queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < settings.PERSIST_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await run_in_db_executor(self._save_messages, batch)
+            except Exception:
+                logger.exception("Failed to persist %d queued messages", len(batch))
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def shutdown(self) -> None:
+        """Flush queued messages and stop the persistence worker."""
+        if self._persist_task is None:
+            return
+        await self._persist_queue.join()
+        self._persist_task.cancel()
+        self._persist_task = None
+
+    @staticmethod
+    def _save_messages(messages: List[Dict[str, Any]]) -> None:
+        # Runs on the DB executor thread, so it owns its own session
+        with get_db_context() as db:
+            try:
+                MessageService.create_messages(db=db, messages=messages)
+                return
+            except SQLAlchemyError:
+                db.rollback()
+                if len(messages) == 1:
+                    raise
+            # A batch mixes replies from many threads; one bad row (say, a
+            # thread deleted mid-stream) must not take the others with it
+            logger.warning("Batch of %d messages failed, saving one by one", len(messages))
+            for message in messages:
+                try:
+                    MessageService.create_messages(db=db, messages=[message])
+                except SQLAlchemyError:
+                    db.rollback()
+                    logger.exception("Failed to persist message for thread %s", message.get("thread_id"))
 
 
 deep_agent_service = DeepAgentService()
\ No newline at end of file
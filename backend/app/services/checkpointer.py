@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer that keeps only what the next turn needs.
+
+    Each (thread, namespace) holds just its latest checkpoint, the blobs it
+    references and its pending writes. Subgraph namespaces (subagent runs)
+    are dropped once the root graph checkpoints after them, and only the
+    most recently used threads are kept at all. State lives in this
+    process: after a restart, on another worker or once a thread is
+    evicted, the agent starts that thread without its earlier turns.
+    """
+
+    def __init__(self, max_threads: int, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        # thread_id -> None, least recently written first
+        self._threads: OrderedDict = OrderedDict()
+        # (thread_id, checkpoint_ns) -> {channel: version} of stored blobs
+        self._versions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        # The checkpoint's blobs are written by put itself, so the ones a
+        # new version replaces can go once it is stored
+        stale = []
+        versions = self._versions.setdefault((thread_id, checkpoint_ns), {})
+        for channel, version in new_versions.items():
+            old = versions.get(channel)
+            if old is not None and old != version:
+                stale.append((thread_id, checkpoint_ns, channel, old))
+            versions[channel] = version
+
+        saved = super().put(config, checkpoint, metadata, new_versions)
+
+        for key in stale:
+            self.blobs.pop(key, None)
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [c for c in checkpoints if c != checkpoint["id"]]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        if checkpoint_ns == "":
+            # A root checkpoint lands only after the step that ran any
+            # subgraphs has finished, so their state is never read again
+            for namespace in [ns for ns in self.storage[thread_id] if ns]:
+                self._drop_namespace(thread_id, namespace)
+
+        self._threads[thread_id] = None
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self.max_threads:
+            self.delete_thread(next(iter(self._threads)))
+        return saved
+
+    def _drop_namespace(self, thread_id: str, checkpoint_ns: str) -> None:
+        for checkpoint_id in self.storage[thread_id].pop(checkpoint_ns):
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for channel, version in self._versions.pop((thread_id, checkpoint_ns), {}).items():
+            self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._threads.pop(thread_id, None)
+        for key in [k for k in self._versions if k[0] == thread_id]:
+            del self._versions[key]
@@ -1,8 +1,8 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, List
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from datetime import datetime
 
-from app.models.database import ContextMemory
+from app.models.database import ContextMemory, utcnow
 from app.schemas.context_memory import ContextMemoryCreate
 
 
@@ -49,20 +49,24 @@ def create_or_update_context_memory(
             existing.thread_id = create_data.thread_id
         if create_data.user_id is not None:
             existing.user_id = create_data.user_id
-        existing.updated_at = datetime.utcnow()
+        existing.updated_at = utcnow()
     else:
-        # Create new
-        new_memory = ContextMemory(
-            key=create_data.key,
-            value=create_data.value,
-            meta_data=create_data.metadata,
-            thread_id=create_data.thread_id,
-            user_id=create_data.user_id,
+        # Create new; RETURNING loads the generated columns with the INSERT
+        new_memory = db.scalar(
+            insert(ContextMemory)
+            .values(
+                key=create_data.key,
+                value=create_data.value,
+                meta_data=create_data.metadata,
+                thread_id=create_data.thread_id,
+                user_id=create_data.user_id,
+            )
+            .returning(ContextMemory)
         )
-        db.add(new_memory)
+        db.expunge(new_memory)
 
+    # No refresh: an updated row reloads lazily only if the caller reads it
     db.commit()
-    db.refresh(new_memory if not existing else existing)
     return new_memory if not existing else existing
 
 
@@ -0,0 +1,78 @@
+import hashlib
+import logging
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Caches final agent answers in ChromaDB, keyed by question embedding."""
+
+    def __init__(self, prompt: str, collection_name: str = "semantic_cache"):
+        # Answers are only reused for the same system prompt and model
+        self.prompt_key = hashlib.sha256(
+            f"{settings.ollama_model}\0{prompt}".encode()
+        ).hexdigest()[:16]
+        self.collection_name = collection_name
+        self._collection = None
+
+    @property
+    def collection(self):
+        # Opened on first use so the vector store (and its embedding model)
+        # is never loaded while the cache is disabled
+        if self._collection is None:
+            from app.services.vector_store import vector_store
+
+            self._collection = vector_store.client.get_or_create_collection(
+                name=self.collection_name,
+                embedding_function=vector_store.embedding_function,
+                metadata={"description": "Cached answers to first-turn questions"},
+                configuration={"hnsw": {"space": "cosine"}},
+            )
+        return self._collection
+
+    def lookup(self, query: str) -> Optional[str]:
+        """
+        Return a cached answer for a semantically equivalent question.
+
+        Args:
+            query: User question
+
+        Returns:
+            Cached answer text, or None on a miss
+        """
+        try:
+            results = self.collection.query(
+                query_texts=[query],
+                n_results=1,
+                where={"prompt_key": self.prompt_key},
+                include=["metadatas", "distances"],
+            )
+        except Exception as e:
+            logger.error(f"Error querying semantic cache: {e}")
+            return None
+
+        distances = results.get("distances") or [[]]
+        if not distances[0] or distances[0][0] > settings.SEMANTIC_CACHE_MAX_DISTANCE:
+            return None
+        return results["metadatas"][0][0].get("response")
+
+    def store(self, query: str, response: str) -> None:
+        """
+        Cache the final answer for a question.
+
+        Args:
+            query: User question
+            response: Full assistant answer
+        """
+        doc_id = hashlib.sha256(f"{self.prompt_key}\0{query}".encode()).hexdigest()
+        try:
+            self.collection.upsert(
+                ids=[doc_id],
+                documents=[query],
+                metadatas=[{"prompt_key": self.prompt_key, "response": response}],
+            )
+        except Exception as e:
+            logger.error(f"Error storing semantic cache entry: {e}")
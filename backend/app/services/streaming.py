@@ -0,0 +1,53 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Callable, Optional
+
+# Yielded by buffered() when idle_timeout() seconds pass without an item
+IDLE = object()
+_END = object()
+
+
+async def buffered(
+    source: AsyncIterable,
+    maxsize: int = 8,
+    idle_timeout: Optional[Callable[[], Optional[float]]] = None,
+) -> AsyncIterator:
+    """
+    Drive an async iterator from a background task through a bounded queue,
+    so producing the next item overlaps with handling the previous one.
+
+    Args:
+        source: Async iterable to drain
+        maxsize: How many items the source may run ahead of the consumer
+        idle_timeout: Optional callable giving the seconds to wait for the
+            next item before yielding IDLE instead (None waits indefinitely)
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def produce():
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception as exc:
+            await queue.put(exc)
+        else:
+            await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            # Waiting on the queue can time out safely; timing out the
+            # source's own step would cancel it
+            timeout = idle_timeout() if idle_timeout is not None else None
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except TimeoutError:
+                yield IDLE
+                continue
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Consumer went away or we are done: stop the source either way
+        producer.cancel()
@@ -1,12 +1,17 @@
 import chromadb
+import threading
+from collections import OrderedDict
 # client for persistent storage
 from chromadb.config import Settings as ChromaSettings
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
 from typing import List, Dict, Optional
 import logging
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_CACHE_SIZE = 2048
+
 
 class VectorStore:
     """Service for managing legal documents in ChromaDB."""
@@ -18,10 +23,46 @@ class VectorStore:
                 anonymized_telemetry=False
             )
         )
+        # Held here so queries can be embedded in batches up front
+        self.embedding_function = DefaultEmbeddingFunction()
+        hnsw = {"ef_construction": 200, "max_neighbors": 32}
+        if settings.CHROMA_EF_SEARCH is not None:
+            hnsw["ef_search"] = settings.CHROMA_EF_SEARCH
         self.collection = self.client.get_or_create_collection(
             name=settings.CHROMA_COLLECTION_NAME,
-            metadata={"description": "Indian legal documents and case laws"}
+            metadata={"description": "Indian legal documents and case laws"},
+            embedding_function=self.embedding_function,
+            # Only applied when the collection is first created. The space
+            # stays Chroma's default l2 so `distance` means the same for old
+            # and new stores; the default model's embeddings are normalized,
+            # so l2 ranks results exactly as cosine would
+            configuration={"hnsw": hnsw}
         )
+        if settings.CHROMA_EF_SEARCH is not None:
+            # ef_search is the one HNSW knob an existing index accepts
+            # changes to; without the setting, stores keep their own value
+            try:
+                self.collection.modify(configuration={"hnsw": {"ef_search": settings.CHROMA_EF_SEARCH}})
+            except Exception as e:
+                logger.error(f"Error updating HNSW ef_search: {e}")
+        # Agents often repeat a search while planning; skip re-embedding it
+        self._embeddings: OrderedDict = OrderedDict()
+        self._embeddings_lock = threading.Lock()
+
+    def _embed_queries(self, queries: List[str]) -> list:
+        """Embed queries, running the model once for all uncached ones."""
+        with self._embeddings_lock:
+            found = {q: self._embeddings[q] for q in queries if q in self._embeddings}
+        missing = [q for q in dict.fromkeys(queries) if q not in found]
+        if missing:
+            found.update(zip(missing, self.embedding_function(missing)))
+        with self._embeddings_lock:
+            for query in queries:
+                self._embeddings[query] = found[query]
+                self._embeddings.move_to_end(query)
+            while len(self._embeddings) > EMBEDDING_CACHE_SIZE:
+                self._embeddings.popitem(last=False)
+        return [found[query] for query in queries]
 
     def search_documents(
         self,
@@ -40,28 +81,48 @@ class VectorStore:
         Returns:
             List of relevant documents with metadata
         """
+        return self.search_documents_batch([query], n_results, filter_metadata)[0]
+
+    def search_documents_batch(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, any]]]:
+        """
+        Search for several queries in a single Chroma call.
+
+        Args:
+            queries: Search query texts
+            n_results: Number of results to return per query
+            filter_metadata: Optional metadata filters
+
+        Returns:
+            One list of documents with metadata per query, in order
+        """
         try:
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=self._embed_queries(queries),
                 n_results=n_results,
-                where=filter_metadata
+                where=filter_metadata,
+                include=["documents", "metadatas", "distances"]
             )
-
-            documents = []
-            if not results.get('documents') or not results['documents'][0]:
-                return documents
-
-            for i in range(len(results['documents'][0])):
-                documents.append({
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i] if results.get('metadatas') and len(results['metadatas'][0]) > i else {},
-                    'distance': results['distances'][0][i] if results.get('distances') and len(results['distances'][0]) > i else None
-                })
-
-            return documents
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
-            return []
+            return [[] for _ in queries]
+
+        batches = []
+        for q in range(len(queries)):
+            documents = []
+            if results.get('documents') and results['documents'][q]:
+                for i in range(len(results['documents'][q])):
+                    documents.append({
+                        'content': results['documents'][q][i],
+                        'metadata': results['metadatas'][q][i] if results.get('metadatas') and len(results['metadatas'][q]) > i else {},
+                        'distance': results['distances'][q][i] if results.get('distances') and len(results['distances'][q]) > i else None
+                    })
+            batches.append(documents)
+        return batches
 
     def get_document_by_id(self, doc_id: str) -> Optional[Dict]:
         """
@@ -74,7 +135,10 @@ class VectorStore:
             Document data or None
         """
         try:
-            result = self.collection.get(ids=[doc_id])
+            result = self.collection.get(
+                ids=[doc_id],
+                include=["documents", "metadatas"]
+            )
             if result.get('documents') and len(result['documents']) > 0:
                 return {
                     'content': result['documents'][0],
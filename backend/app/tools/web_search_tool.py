@@ -1,17 +1,49 @@
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import Literal
-from tavily import TavilyClient
+from tavily import AsyncTavilyClient
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+from app.core.config import settings
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
-tavily_client = TavilyClient()
+# Async client with a pooled httpx connection, so searches never block
+# the event loop and reuse keep-alive connections to Tavily
+tavily_client = AsyncTavilyClient()
+
+# (query, max_results, topic, include_raw_content) -> (expires_at, results).
+# Agents often repeat a search while planning. The lock keeps the cache
+# safe should the tool ever be invoked from a worker thread.
+_search_cache: OrderedDict = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+
+def _cache_get(key):
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _search_cache[key]
+            return None
+        _search_cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key, results) -> None:
+    with _search_cache_lock:
+        _search_cache[key] = (time.monotonic() + settings.SEARCH_CACHE_TTL, results)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > settings.SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
 
 
 @tool
-def internet_search(
+async def internet_search(
     query: str,
     max_results: int = 5,
     topic: Literal["general", "news", "finance"] = "general",
@@ -28,15 +60,22 @@ def internet_search(
     Returns:
         Search results as a dict
     """
+    key = (query, max_results, topic, include_raw_content)
+    cached = _cache_get(key)
+    if cached is not None:
+        logger.info("Search cache hit for: %s", query)
+        return cached
+
     try:
         logger.info("Searching for: %s (max_results=%d, topic=%s)", query, max_results, topic)
-        results = tavily_client.search(
+        results = await tavily_client.search(
             query,
             max_results=max_results,
             include_raw_content=include_raw_content,
             topic=topic,
         )
         logger.info("Search returned %d results", len(results.get("results", [])) if isinstance(results, dict) else 0)
+        _cache_put(key, results)
         return results
     except Exception as e:
         logger.exception("Search failed for query '%s': %s", query, e)
@@ -1,15 +1,21 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.db.session import init_db
+from app.db.session import init_db, db_executor, warm_up_pool
 from app.api import auth, chat
+from app.services.agent import deep_agent_service
 import os
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
-    description="AI Legal Assistant for Indian Legal System"
+    description="AI Legal Assistant for Indian Legal System",
+    # Thread and message lists can be large; encode them with orjson
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -29,6 +35,12 @@ app.include_router(chat.router)
 @app.on_event("startup")
 def startup_event():
     """Initialize database and seed sample data on startup."""
+    warm_up_pool()
+    # With several workers each would race the same CREATE TABLEs; when a
+    # deploy step manages the schema, skip it here
+    if not settings.DB_AUTO_CREATE:
+        return
+    
     init_db()
     
     # Automatically seed default demo user if not exists
@@ -54,8 +66,26 @@ def startup_event():
         db.close()
 
 
+@app.on_event("startup")
+async def configure_default_executor():
+    """Size the event loop's default executor for concurrent agent streams."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=settings.THREAD_POOL_SIZE,
+            thread_name_prefix="default"
+        )
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Let queued DB writes finish before the worker exits."""
+    await deep_agent_service.shutdown()
+    db_executor.shutdown(wait=True)
+
+
 @app.get("/")
-def root():
+async def root():
     """Root endpoint."""
     return {
         "app": settings.APP_NAME,
@@ -65,7 +95,7 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
@@ -0,0 +1,136 @@
+"""
+Streaming tests for DeepAgentService.
+
+Run from the backend directory:
+    python -m unittest discover -s test
+"""
+
+import asyncio
+import os
+import unittest
+
+import orjson
+
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.tools import tool
+
+from app.services.agent import SYSTEM_PROMPT, DeepAgentService
+
+
+class _FakeModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _frames(body: bytes):
+    return [orjson.loads(frame[len(b"data: "):]) for frame in body.split(b"\n\n") if frame]
+
+
+class StreamChatResponseTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_summarization_tokens_are_not_streamed(self):
+        # A small context budget makes the summarization middleware call
+        # the model itself before the turn that overflows it
+        answers = [AIMessage(content=f"ANSWER{i} " + "word " * 60) for i in range(1, 10)]
+        model = _FakeModel(messages=iter(answers), profile={"max_input_tokens": 600})
+
+        service = DeepAgentService()
+        service._llm = model
+        saved = []
+
+        async def enqueue(**fields):
+            saved.append(fields["content"])
+
+        service._enqueue_message = enqueue
+
+        replies = []
+        for _ in range(4):
+            body = b"".join([frame async for frame in service.stream_chat_response("question " * 40, 1)])
+            frames = _frames(body)
+            self.assertEqual(frames[-1]["type"], "end")
+            replies.append("".join(f["content"] for f in frames if f["type"] == "content"))
+
+        # Turn four triggers summarization, which consumes ANSWER4; the
+        # user only ever sees what the agent's model node answered
+        self.assertEqual([reply.split()[0] for reply in replies], ["ANSWER1", "ANSWER2", "ANSWER3", "ANSWER5"])
+        self.assertEqual(saved, replies)
+        self.assertNotIn("ANSWER4", replies[3])
+
+    async def test_buffered_text_is_flushed_while_model_pauses(self):
+        class PausingModel(_FakeModel):
+            async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+                for i, token in enumerate(["Hello", " world", " after", " pause"]):
+                    if i == 2:
+                        await asyncio.sleep(0.5)
+                    chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                    if run_manager:
+                        await run_manager.on_llm_new_token(token, chunk=chunk)
+                    yield chunk
+
+        service = DeepAgentService()
+        service._llm = PausingModel(messages=iter([]))
+
+        async def enqueue(**fields):
+            pass
+
+        service._enqueue_message = enqueue
+
+        contents = []
+        async for frame in service.stream_chat_response("hi", 1):
+            parsed = _frames(frame)[0]
+            if parsed["type"] == "content":
+                contents.append(parsed["content"])
+
+        # " world" goes out during the pause instead of riding along with " after"
+        self.assertIn(" world", contents)
+        self.assertEqual("".join(contents), "Hello world after pause")
+
+    async def test_subagent_tool_calls_are_reported(self):
+        @tool
+        def lookup_statute(query: str) -> str:
+            """Look up a statute."""
+            return "IPC 420: cheating"
+
+        model = _FakeModel(disable_streaming=True, messages=iter([
+            AIMessage(content="", tool_calls=[{
+                "name": "task", "id": "call-task",
+                "args": {"description": "Find section 420", "subagent_type": "researcher"},
+            }]),
+            AIMessage(content="", tool_calls=[{
+                "name": "lookup_statute", "id": "call-lookup", "args": {"query": "420"},
+            }]),
+            AIMessage(content="Section 420 covers cheating."),
+            AIMessage(content="Final answer."),
+        ]))
+        service = DeepAgentService()
+        service._llm = model
+        service._agent = service._create_deep_agent(SYSTEM_PROMPT, subagents=[{
+            "name": "researcher",
+            "description": "Researches statutes.",
+            "system_prompt": "Research the question.",
+            "tools": [lookup_statute],
+        }])
+
+        async def enqueue(**fields):
+            pass
+
+        service._enqueue_message = enqueue
+
+        body = b"".join([frame async for frame in service.stream_chat_response("What is 420?", 1)])
+        frames = _frames(body)
+        calls = [f["tool_name"] for f in frames if f["type"] == "tool_call"]
+        results = [f["tool_name"] for f in frames if f["type"] == "tool_result"]
+
+        self.assertEqual(calls, ["task", "lookup_statute"])
+        self.assertEqual(results, ["lookup_statute", "task"])
+        self.assertEqual(frames[-1]["checkpointer_metadata"]["tools_used"], 2)
+        # The subagent's own reply is not streamed as the answer
+        self.assertEqual("".join(f["content"] for f in frames if f["type"] == "content"), "Final answer.")
+
+
+if __name__ == "__main__":
+    unittest.main()
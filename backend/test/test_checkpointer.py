@@ -0,0 +1,95 @@
+"""
+BoundedMemorySaver tests.
+
+Run from the backend directory:
+    python -m unittest discover -s test
+"""
+
+import operator
+import unittest
+from typing import Annotated, List, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from app.services.checkpointer import BoundedMemorySaver
+
+
+class _State(TypedDict):
+    log: Annotated[List[str], operator.add]
+
+
+def _build_graph(checkpointer):
+    # The inner graph stands in for a subagent: compiled without its own
+    # checkpointer, it runs under a "research:<task id>" namespace
+    inner = StateGraph(_State)
+    inner.add_node("search", lambda state: {"log": ["searched"]})
+    inner.add_node("summarize", lambda state: {"log": ["summarized"]})
+    inner.add_edge(START, "search")
+    inner.add_edge("search", "summarize")
+    inner.add_edge("summarize", END)
+    subgraph = inner.compile()
+
+    outer = StateGraph(_State)
+    outer.add_node("research", lambda state: {"log": subgraph.invoke({"log": []})["log"]})
+    outer.add_node("answer", lambda state: {"log": ["answered"]})
+    outer.add_edge(START, "research")
+    outer.add_edge("research", "answer")
+    outer.add_edge("answer", END)
+    return outer.compile(checkpointer=checkpointer)
+
+
+def _config(thread_id: str):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class BoundedMemorySaverTest(unittest.TestCase):
+
+    def test_keeps_only_the_latest_checkpoint(self):
+        saver = BoundedMemorySaver(max_threads=10)
+        graph = _build_graph(saver)
+        for _ in range(3):
+            graph.invoke({"log": ["asked"]}, _config("1"))
+
+        self.assertEqual(list(saver.storage["1"]), [""])
+        self.assertEqual(len(saver.storage["1"][""]), 1)
+        # Every turn is still visible through the one checkpoint
+        state = graph.get_state(_config("1")).values
+        self.assertEqual(state["log"], ["asked", "searched", "summarized", "answered"] * 3)
+        # Only blobs the latest checkpoint references survive
+        latest = saver.get_tuple(_config("1")).checkpoint
+        live = {("1", "", channel, version) for channel, version in latest["channel_versions"].items()}
+        self.assertEqual(set(saver.blobs), live)
+
+    def test_subgraph_namespaces_are_dropped(self):
+        saver = BoundedMemorySaver(max_threads=10)
+        graph = _build_graph(saver)
+        seen = set()
+        put = saver.put
+
+        def recording_put(config, *args):
+            seen.add(config["configurable"]["checkpoint_ns"])
+            return put(config, *args)
+
+        saver.put = recording_put
+        for _ in range(5):
+            graph.invoke({"log": ["asked"]}, _config("1"))
+
+        self.assertTrue(any(ns.startswith("research:") for ns in seen))
+        self.assertEqual(list(saver.storage["1"]), [""])
+        self.assertTrue(all(key[1] == "" for key in saver.blobs))
+        self.assertTrue(all(key[1] == "" for key in saver.writes))
+
+    def test_evicts_least_recently_used_threads(self):
+        saver = BoundedMemorySaver(max_threads=2)
+        graph = _build_graph(saver)
+        for thread_id in ["1", "2", "1", "3"]:
+            graph.invoke({"log": ["asked"]}, _config(thread_id))
+
+        self.assertEqual(list(saver._threads), ["1", "3"])
+        self.assertIsNone(saver.get_tuple(_config("2")))
+        self.assertFalse(any(key[0] == "2" for key in saver.blobs))
+        self.assertEqual(graph.get_state(_config("1")).values["log"].count("asked"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
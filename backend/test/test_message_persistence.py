@@ -0,0 +1,59 @@
+"""
+Background message persistence tests.
+
+Run from the backend directory:
+    python -m unittest discover -s test
+"""
+
+import os
+import unittest
+
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal, engine, init_db
+from app.models.database import ChatMessage, ChatThread, MessageRole, User
+from app.services.agent import DeepAgentService
+
+
+class PersistWorkerTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        init_db()
+        # SQLite only enforces foreign keys when asked; Postgres always does
+        with engine.connect() as conn:
+            conn.execute(text("PRAGMA foreign_keys=ON"))
+        with SessionLocal() as db:
+            user = User(username="persist-test", hashed_password="x")
+            thread = ChatThread(user=user, title="live")
+            db.add(thread)
+            db.commit()
+            self.user_id = user.id
+            self.thread_id = thread.id
+
+    def tearDown(self):
+        with SessionLocal() as db:
+            db.query(ChatMessage).filter(ChatMessage.thread_id == self.thread_id).delete()
+            db.query(ChatThread).filter(ChatThread.user_id == self.user_id).delete()
+            db.query(User).filter(User.id == self.user_id).delete()
+            db.commit()
+        with engine.connect() as conn:
+            conn.execute(text("PRAGMA foreign_keys=OFF"))
+
+    async def test_bad_row_does_not_drop_the_rest_of_the_batch(self):
+        service = DeepAgentService()
+        # Queued back to back, so the worker commits them as one batch
+        await service._enqueue_message(thread_id=self.thread_id, role=MessageRole.AI, content="kept")
+        await service._enqueue_message(thread_id=self.thread_id + 1000, role=MessageRole.AI, content="orphan")
+        await service._enqueue_message(thread_id=self.thread_id, role=MessageRole.AI, content="also kept")
+        with self.assertLogs("app.services.agent", level="WARNING"):
+            await service.shutdown()
+
+        with SessionLocal() as db:
+            stored = [m.content for m in db.query(ChatMessage).order_by(ChatMessage.id)]
+        self.assertEqual(stored, ["kept", "also kept"])
+
+
+if __name__ == "__main__":
+    unittest.main()